@@ -32,12 +32,34 @@
 
 import pyeapi
 from pyeapi.eapilib import CommandError
-from pyeapi.utils import make_iterable
 from robot.api import logger
 from robot.utils import ConnectionCache
-from version import VERSION
+from multiprocessing.pool import ThreadPool
+from .version import VERSION
 import re
 
+# Commands describing the state of a node rather than its configuration.
+# They are fetched together in a single eAPI request, falling back to the
+# one command needed if the node rejects any of them, and cached for each
+# connection until 'Refresh Node State' is called.
+NODE_STATE_CMDS = ['show version', 'show extensions']
+
+# Upper bound on the number of switches contacted at the same time by the
+# keywords operating on all connected switches.
+MAX_PARALLEL_SWITCHES = 32
+
+# Regex special characters other than '.'. An expected version without any
+# of them is found by the regex whenever it is found as a substring.
+_VERSION_REGEX_SPECIAL = re.compile(r'[\\^$*+?{}\[\]|()]')
+
+# Accepted values of the available argument of List Extensions.
+_EXTENSION_AVAILABLE = frozenset((True, False, 'any'))
+
+# Extension status wanted for each value of the installed argument of
+# List Extensions, None meaning any status.
+_EXTENSION_STATUS = {True: 'installed', False: 'notInstalled',
+                     'forced': 'forceInstalled', 'any': None}
+
 
 class AristaLibrary(object):
     """AristaLibrary - A Robot Framework Library for testing Arista EOS Devices.
@@ -78,6 +100,10 @@ class AristaLibrary(object):
     ROBOT_LIBRARY_SCOPE = 'GLOBAL'
     ROBOT_LIBRARY_VERSION = VERSION
 
+    __slots__ = ('host', 'transport', 'port', 'username', 'password', 'alias',
+                 'connections', '_node_state', '_clients', '_version_patterns',
+                 '_connection')
+
     def __init__(self, transport="https", host='localhost',
                  username="admin", password="admin", port="443", alias=None):
         """Defaults may be changed by specifying when importing the library:
@@ -92,13 +118,16 @@ class AristaLibrary(object):
         self.password = password
         self.alias = None
         self.connections = dict()
+        self._node_state = dict()
+        self._clients = dict()
+        self._version_patterns = dict()
         self._connection = ConnectionCache()
 
     # ---------------- Start Core Keywords ---------------- #
 
     def connect_to(self, host='localhost', transport='https', port='443',
                    username='admin', password='admin', alias=None,
-                   enablepwd=None, autorefresh=True):
+                   enablepwd=None, autorefresh=True, verify=True):
 
         """This is the cornerstone of all testing. The Connect To
         keyword accepts the necessary parameters to setup an API connection to
@@ -113,6 +142,16 @@ class AristaLibrary(object):
 
         | ${switch1}= | Connect To | host=192.0.2.51 | username=myUser | password=secret |
 
+        Connecting to the same node again with identical parameters registers
+        a new connection index but reuses the existing eAPI connection.
+
+        By default the node is queried with 'show version' so that a wrong
+        address or credentials fail the keyword right away. Set verify=False
+        to skip this request when setting up many connections; errors will
+        then surface on the first keyword that talks to the node.
+
+        | Connect To | host=192.0.2.52 | username=myUser | password=secret | verify=False |
+
         You can confirm which interface eAPI is listening on by running:
         | veos-node>show management api http-commands
         | *Enabled:        Yes*
@@ -148,22 +187,26 @@ class AristaLibrary(object):
         password = str(password)
         if alias:
             alias = str(alias)
-        try:
+        # Reuse the eAPI connection of an earlier Connect To with the same
+        # parameters instead of setting up a new one.
+        client_key = (transport, host, port, username, password)
+        client = self._clients.get(client_key)
+        if client is None:
             client = pyeapi.connect(
                 host=host, transport=transport,
                 username=username, password=password, port=port)
-            client_node = pyeapi.client.Node(client)
-            client_node.autorefresh = autorefresh
-            client_node.enable_authentication(enablepwd)
-            conn_indx = self._connection.register(client_node, alias)
-        except Exception as e:
-            raise e
-
-        # Always try "show version" when connecting to a node so that if
-        #  there is a configuration error, we can fail quickly.
-        try:
-            ver = self._connection.current.enable(
-                ['show version'])[0]['result']
+        client_node = pyeapi.client.Node(client)
+        client_node.autorefresh = autorefresh
+        client_node.enable_authentication(enablepwd)
+
+        # Unless disabled, try "show version" when connecting to a node so
+        #  that if there is a configuration error, we can fail quickly. The
+        #  node is only registered once it has answered, so a failed
+        #  connection never becomes the active switch.
+        version_response = None
+        if verify:
+            version_response = client_node.enable(['show version'])[0]
+            ver = version_response['result']
             mesg = "Created connection to {}://{}:{}@{}:{}/command-api: "\
                 "model: {}, serial: {}, systemMAC: {}, version: {}, "\
                 "lastBootTime: {}".format(
@@ -172,19 +215,29 @@ class AristaLibrary(object):
                     ver['systemMacAddress'],
                     ver['version'], ver['bootupTimestamp'])
             logger.write(mesg, 'INFO', False)
-        except Exception as e:
-            raise e
-
-        self.connections[conn_indx] = dict(conn=client,
-                                           node=client_node,
-                                           index=conn_indx,
-                                           transport=transport,
-                                           host=host,
-                                           username=username,
-                                           password=password,
-                                           port=port,
-                                           alias=alias,
-                                           autorefresh=autorefresh)
+        else:
+            logger.write("Created unverified connection to "
+                         "{}://{}:{}@{}:{}/command-api".format(
+                             transport, username, '****', host, port),
+                         'INFO', False)
+
+        conn_indx = self._connection.register(client_node, alias)
+        self._clients[client_key] = client
+        # Seed the node state with the probe so that the version keywords do
+        # not need to send 'show version' again.
+        self._node_state[conn_indx] = {}
+        if version_response:
+            self._node_state[conn_indx]['show version'] = version_response
+        self.connections[conn_indx] = {'conn': client,
+                                       'node': client_node,
+                                       'index': conn_indx,
+                                       'transport': transport,
+                                       'host': host,
+                                       'username': username,
+                                       'password': password,
+                                       'port': port,
+                                       'alias': alias,
+                                       'autorefresh': autorefresh}
         return conn_indx
 
     def change_to_switch(self, index_or_alias):
@@ -222,6 +275,8 @@ class AristaLibrary(object):
         self.username = 'admin'
         self.password = 'admin'
         self.connections = dict()
+        self._node_state = dict()
+        self._clients = dict()
         # Since we don't really have anything to close, just delete entries.
         # self._connection.close_all()
         self._connection.empty_cache()
@@ -240,13 +295,16 @@ class AristaLibrary(object):
         """
 
         if not index_or_alias:
-            index_or_alias = self._connection.current_index
-        # values = self.connections[index_or_alias]
-        try:
-            values = self.connections[
-                self._connection._resolve_alias_or_index(index_or_alias)
-            ]
-        except (ValueError, KeyError):
+            # The active index is already resolved
+            index = self._connection.current_index
+        else:
+            try:
+                index = self._connection._resolve_alias_or_index(
+                    index_or_alias)
+            except ValueError:
+                index = None
+        values = self.connections.get(index)
+        if values is None:
             values = {
                 'index': None,
                 'alias': None
@@ -265,10 +323,7 @@ class AristaLibrary(object):
         | @{switch_info}= | Get Switches                                             |      |
         | Log             | First switch connected to port ${switch_info[0]['port']} |      |
         """
-        return_value = list()
-        for indx, values in self.connections.items():
-            return_value.append(values)
-        return return_value
+        return list(self.connections.values())
 
     # ---------------- End Core Keywords ---------------- #
 
@@ -298,16 +353,10 @@ class AristaLibrary(object):
         | ${json_dict}= | Run Cmds | show version                |               |
         | ${raw_text}=  | Run Cmds | show interfaces description | encoding=text |
         """
-        if isinstance(commands, basestring):
-            commands = [str(commands)]
-        elif isinstance(commands, list):
-            # Handle Python2 unicode strings
-            for idx, command in enumerate(commands):
-                if isinstance(command, unicode):
-                    commands[idx] = str(command)
+        if isinstance(commands, (str, dict)):
+            commands = [commands]
 
         try:
-            commands = make_iterable(commands)
             client = self.connections[self._connection.current_index]['conn']
             return client.execute(commands, encoding)
         except CommandError as e:
@@ -351,13 +400,8 @@ class AristaLibrary(object):
         | @{commands}=  | show version | show interfaces Ethernet 1  |               |
         | ${json_dict}= | Run Commands | ${commands}                 |               |
         """
-        if isinstance(commands, basestring):
-            commands = [str(commands)]
-        elif isinstance(commands, list):
-            # Handle Python2 unicode strings
-            for idx, command in enumerate(commands):
-                if isinstance(command, unicode):
-                    commands[idx] = str(command)
+        if isinstance(commands, str):
+            commands = [commands]
 
         try:
             if all_info:
@@ -374,7 +418,7 @@ class AristaLibrary(object):
         except Exception as e:
             raise AssertionError('eAPI execute command: {}'.format(e))
 
-    def enable(self, commands, encoding='json'):
+    def enable(self, commands, encoding='json', switch_id=None):
         """
         The Enable keyword lets you run a list of commands in enable mode.
         It returns a list containing the list of commands, output of those
@@ -382,34 +426,138 @@ class AristaLibrary(object):
         function. If a command fails due to an encoding error, then the command
         set will be re-issued individual with text encoding.
 
+        All of the commands in the list are sent to the switch in a single
+        eAPI request, so running several show commands with one Enable is
+        faster than running them one at a time. eAPI stops at the first
+        command that fails and the keyword fails without returning the
+        output of the others.
+
         Arguments:
         - `command`: This must be the full eAPI command and not the short form
         that works on the CLI.  `commands` may be a single command or a list of
         commands.  When passing a list to Run Commands, it should be given as a
         scalar.
+        - `switch_id`: (Optional) The connection index or alias of the switch
+        to run the commands on. The active switch is used if omitted, and is
+        not changed otherwise.
 
 
         Example:
         | @{list_v}=        | Create List | show version | show hostname |
         | ${enable}=        | Enable      | ${list_v}    |               |
+        | ${enable}=        | Enable      | ${list_v}    | switch_id=2   |
         """
 
-        if isinstance(commands, basestring):
-            commands = [str(commands)]
-        elif isinstance(commands, list):
-            # Handle Python2 unicode strings
-            for idx, command in enumerate(commands):
-                if isinstance(command, unicode):
-                    commands[idx] = str(command)
+        if isinstance(commands, str):
+            commands = [commands]
 
         try:
-            return self._connection.current.enable(commands, encoding)
+            node = self._connection.get_connection(switch_id)
+            return node.enable(commands, encoding)
         except CommandError as e:
             raise AssertionError('eAPI enable CommandError:'
                                  ' {} {}'.format(e, commands))
         except Exception as e:
             raise AssertionError('eAPI enable execute command: {}'.format(e))
 
+    def run_commands_on_switches(self, commands, encoding='json'):
+        """Run Commands On Switches runs the given commands in enable mode on
+        every connected switch at the same time and returns a dictionary,
+        keyed by connection index, holding the list of command results of each
+        switch. The active switch is not changed.
+
+        Since the switches are queried concurrently, the keyword takes about as
+        long as the slowest switch instead of the sum of all of them.
+
+        Arguments:
+        - `commands`: This must be the full eAPI command and not the short form
+        that works on the CLI.  `commands` may be a single command or a list of
+        commands.
+        - `encoding` is the format of the response, either 'json' or 'text'.
+
+        Example:
+        | ${outputs}= | Run Commands On Switches | show version |
+        | Log         | ${outputs[1][0]['version']}             |
+        """
+        if isinstance(commands, str):
+            commands = [commands]
+
+        def run(index):
+            node = self.connections[index]['node']
+            try:
+                reply = node.enable(commands, encoding)
+            except CommandError as e:
+                raise AssertionError('eAPI enable CommandError on switch {}:'
+                                     ' {} {}'.format(index, e, commands))
+            except Exception as e:
+                raise AssertionError('eAPI enable execute command on switch'
+                                     ' {}: {}'.format(index, e))
+            return [response['result'] for response in reply]
+
+        return self._on_switches(run)
+
+    def enable_on_switches(self, commands, encoding='json'):
+        """Enable On Switches runs commands in enable mode on several switches
+        at the same time and returns a dictionary, keyed by connection index,
+        holding the Enable output of each switch. Unlike Run Commands On
+        Switches, each switch may be given different commands. The active
+        switch is not changed.
+
+        Arguments:
+        - `commands`: A dictionary mapping the connection index or alias of
+        each switch to the command, or list of commands, to run on it.
+        - `encoding` is the format of the response, either 'json' or 'text'.
+
+        Example:
+        | ${commands}= | Create Dictionary  | 1=show version | 2=show hostname |
+        | ${outputs}=  | Enable On Switches | ${commands}    |                 |
+        | Log          | ${outputs[2][0]['result']['hostname']} |            |
+        """
+        by_index = dict()
+        for switch_id, switch_cmds in commands.items():
+            index = self._connection._resolve_alias_or_index(switch_id)
+            by_index[index] = switch_cmds
+
+        def run(index):
+            return self.enable(by_index[index], encoding, switch_id=index)
+
+        return self._on_switches(run, list(by_index))
+
+    def _on_switches(self, func, indexes=None):
+        """Calls func with the index of every connected switch, or of the
+        given switch indexes, in a pool of threads and returns a dictionary of
+        the return values keyed by index.
+
+        Connections made with the same parameters share one eAPI client,
+        which cannot send two requests at once, so the indexes of each
+        client are handled in turn by a single thread.
+        """
+        if indexes is None:
+            indexes = list(self.connections)
+        if not indexes:
+            return dict()
+        by_client = dict()
+        for index in indexes:
+            client = self.connections[index]['conn']
+            by_client.setdefault(id(client), []).append(index)
+
+        def run(group):
+            return [(index, func(index)) for index in group]
+
+        if len(by_client) == 1:
+            # Nothing could run in parallel, so skip starting threads
+            return dict(run(indexes))
+
+        pool = ThreadPool(min(MAX_PARALLEL_SWITCHES, len(by_client)))
+        try:
+            results = dict()
+            for pairs in pool.map(run, list(by_client.values())):
+                results.update(pairs)
+            return dict((index, results[index]) for index in indexes)
+        finally:
+            pool.close()
+            pool.join()
+
     def get_startup_config(self, section=None):
         """
         The Get Startup Config keyword retrieves the startup config from
@@ -498,7 +646,7 @@ class AristaLibrary(object):
         | ${config}=        | Config      | ${commands}  |               |
         """
 
-        if isinstance(commands, basestring):
+        if isinstance(commands, str):
             commands = [commands]
 
         try:
@@ -536,18 +684,56 @@ class AristaLibrary(object):
         | Uptime:                 21 hours and 59 minutes
         | Total memory:           2028804 kB
         | Free memory:            285504 kB
+
+        The 'show version' output is cached for the active switch, use
+        Refresh Node State to fetch it again after an upgrade.
         """
-        try:
-            out = self._connection.current.enable(['show version'])[0]['result']
-            version_number = str(out['version'])
-        except Exception as e:
-            raise e
-            return False
-        if not re.search(str(version), version_number):
+        out = self._get_node_state('show version')['result']
+        version_number = str(out['version'])
+        if not self._version_matches(version, version_number):
             raise AssertionError('Searched for %s, Found %s'
                                  % (str(version), version_number))
         return True
 
+    def version_should_contain_on_switches(self, version):
+        """Version Should Contain On Switches compares the EOS version running
+        on every connected switch with the string provided, in the same way as
+        Version Should Contain. The switches are queried concurrently and a
+        single error listing every mismatching switch is raised.
+
+        Example:
+        | Version Should Contain On Switches | 4.14.0F |
+        """
+        def get_version(index):
+            out = self._get_node_state('show version', index)['result']
+            return str(out['version'])
+
+        versions = self._on_switches(get_version)
+        mismatches = ['switch %s: %s' % (index, version_number)
+                      for index, version_number in sorted(versions.items())
+                      if not self._version_matches(version, version_number)]
+        if mismatches:
+            raise AssertionError('Searched for %s, Found %s'
+                                 % (str(version), ', '.join(mismatches)))
+        return True
+
+    def _version_matches(self, version, version_number):
+        """Returns True if the expected version string is found in
+        version_number. Plain versions such as 4.14.0F are looked for as a
+        substring first, and the compiled regex is only used when that
+        misses or the version contains other regex characters.
+        """
+        version = str(version)
+        entry = self._version_patterns.get(version)
+        if entry is None:
+            entry = self._version_patterns[version] = (
+                not _VERSION_REGEX_SPECIAL.search(version),
+                re.compile(version))
+        plain, pattern = entry
+        if plain and version in version_number:
+            return True
+        return pattern.search(version_number) is not None
+
     def list_extensions(self, available='any', installed='any'):
         """List Extensions returns a list with the name of each
         extension present on the node.
@@ -583,46 +769,32 @@ class AristaLibrary(object):
 
         Note: If you want all data pertaining to the extensions use the Get
         Extensions keyword.
+
+        The 'show extensions' output is cached for the active switch, use
+        Refresh Node State to fetch it again after installing extensions.
         """
         # Confirm parameter values are acceptable
-        if available not in [True, False, 'any']:
+        if available not in _EXTENSION_AVAILABLE:
             raise AssertionError('Incorrect parameter value: %s. '
                                  'Choose from [True|False|any]' % available)
 
-        if installed not in [True, False, 'forced', 'any']:
+        if installed not in _EXTENSION_STATUS:
             raise AssertionError('Incorrect parameter value: %s. '
                                  'Choose from [True|False|forced|any]' %
                                  installed)
 
-        try:
-            out = self._connection.current.enable(['show extensions'])
-            out = out[0]
-        except Exception as e:
-            raise e
+        out = self._get_node_state('show extensions')
 
         if out['encoding'] == 'json':
             extensions = out['result']['extensions']
-            filtered = []
-            for ext, data in extensions.items():
-                if available and data['presence'] != 'present':
-                    continue
-                elif not available and data['presence'] == 'present':
-                    continue
-
-                if installed and data['status'] is not 'installed':
-                    continue
-                elif installed == "forced" and data['status'] != \
-                        'forceInstalled':
-                    continue
-                elif not installed and \
-                        data['status'] != 'notInstalled':
-                    continue
-
-                # If all of the checks above pass then we can append the
-                # extension to the list
-                filtered.append(ext)
-
-            return filtered
+            # Work out once what each extension is compared against, None
+            # meaning it is not filtered on
+            present = None if available == 'any' else bool(available)
+            status = _EXTENSION_STATUS[installed]
+            return [ext for ext, data in extensions.items()
+                    if (present is None or
+                        (data['presence'] == 'present') == present) and
+                    (status is None or data['status'] == status)]
 
     def refresh(self):
         """Refreshes the instance config properties
@@ -665,6 +837,50 @@ class AristaLibrary(object):
 
         self._connection.current.refresh()
 
+    def refresh_node_state(self):
+        """Refresh Node State clears the cached state of the active switch.
+
+        Keywords such as Version Should Contain and List Extensions read the
+        output of 'show version' and 'show extensions' from a cache that is
+        seeded by Connect To and otherwise filled with a single eAPI request
+        the first time one of them is used.
+        Use this keyword when the state of the node is expected to have
+        changed, e.g. after an upgrade or after installing an extension.
+
+        Example:
+        | Version Should Contain | 4.14.0F |
+        | Refresh Node State     |         |
+        | Version Should Contain | 4.15.0F |
+        """
+        self._node_state.pop(self._connection.current_index, None)
+
+    def _get_node_state(self, cmd, index=None):
+        """Returns the cached response to one of the NODE_STATE_CMDS for the
+        switch at index, or the active switch when no index is given. All
+        missing state commands are sent to the node in a single request so
+        that subsequent keywords do not need to contact it. If the node
+        rejects that request, only cmd is sent.
+        """
+        if index is None:
+            index = self._connection.current_index
+            node = self._connection.current
+        else:
+            node = self.connections[index]['node']
+        state = self._node_state.setdefault(index, dict())
+        if cmd not in state:
+            missing = [c for c in NODE_STATE_CMDS if c not in state]
+            try:
+                reply = node.enable(missing)
+            except CommandError:
+                # eAPI aborts the request at the first command that fails, so
+                # a state command the node rejects must not take cmd with it
+                if missing == [cmd]:
+                    raise
+                missing = [cmd]
+                reply = node.enable(missing)
+            state.update(zip(missing, reply))
+        return state[cmd]
+
     def ping_test(self, address, vrf='default', source_int=None):
         """
         The Ping Test keyword pings the provided IP address from current device
@@ -698,12 +914,9 @@ class AristaLibrary(object):
         source = ''
         if source_int:
             source = ' source %s' % source_int
-        try:
-            out = self._connection.current.enable(
-                ['ping vrf %s %s%s' % (vrf, address, source)], encoding='text')
-            out = out[0]['result']
-        except Exception as e:
-            raise e
+        out = self._connection.current.enable(
+            ['ping vrf %s %s%s' % (vrf, address, source)], encoding='text')
+        out = out[0]['result']
 
         pattern = r'(\d+)% packet loss'
         match = re.search(pattern, out['output'])
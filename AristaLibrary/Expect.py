@@ -30,11 +30,505 @@
 # vim: tabstop=4 expandtab shiftwidth=4 softtabstop=4
 
 import re
+import time
 import logging
+from functools import reduce
+from operator import getitem
 from robot.libraries.BuiltIn import BuiltIn, RobotNotRunningError
-from version import VERSION
+from .version import VERSION
 
 AE_ERR = 'AristaLibrary.Expect: '       # Arista Expect Error prefix
+AE_ERR_UNKNOWN_TYPE = AE_ERR + 'Unable to determine type of return value'
+
+# Commands whose output is stored as config text
+SHOW_CONFIG_CMDS = ('show startup-config', 'show running-config')
+
+# Parsed Expect keys, and the number kept before the table is emptied
+_PARSED_KEYS = {}
+PARSED_KEYS_MAX = 1024
+
+# Compiled contains line patterns, and the number kept before the table is
+# emptied
+_LINE_PATTERNS = {}
+LINE_PATTERNS_MAX = 256
+
+
+def _parse_key(key):
+    """Returns the list of nested keys in key along with key in lower case.
+    Test suites reuse the same keys many times, so the result is kept.
+    """
+    try:
+        return _PARSED_KEYS[key]
+    except KeyError:
+        if len(_PARSED_KEYS) >= PARSED_KEYS_MAX:
+            _PARSED_KEYS.clear()
+        parsed = _PARSED_KEYS[key] = (key.split(), key.lower())
+        return parsed
+
+
+def _line_pattern(match):
+    """Returns the compiled pattern used to look for match in a line.
+    Suites often look for the same line many times, so patterns are kept.
+    """
+    try:
+        return _LINE_PATTERNS[match]
+    except KeyError:
+        if len(_LINE_PATTERNS) >= LINE_PATTERNS_MAX:
+            _LINE_PATTERNS.clear()
+        pattern = _LINE_PATTERNS[match] = re.compile(r"\s*{}".format(match))
+        return pattern
+
+
+def _lookup(returned, keylist):
+    """Returns the value of the nested keys in keylist from returned.
+    Keys that index into a list are converted to integers.
+    """
+    try:
+        if len(keylist) == 1:
+            return returned[keylist[0]]
+        return reduce(getitem, keylist, returned)
+    except TypeError as e:
+        if 'list indices must be integers' not in str(e):
+            raise
+    # A list was found along the way, walk the keys one at a time
+    for k in keylist:
+        try:
+            returned = returned[k]
+        except TypeError as e:
+            if 'list indices must be integers' in str(e):
+                returned = returned[int(k)]
+            else:
+                raise
+    return returned
+
+
+class _ConfigText(object):
+    """The text of a 'show *-config' reply, stored by Get Command Output in
+    place of the list of its lines. It can be iterated over and searched
+    like that list but not indexed; Get Value with the 'config' key still
+    returns a list of the lines.
+
+    The text is split into a tuple of lines only when they are first
+    needed, and is not kept after that. Stripped line matches are answered
+    from a set built from that tuple, which shares its strings.
+    """
+    __slots__ = ('_text', '_lines', '_stripped_lines')
+
+    def __init__(self, text):
+        self._text = text
+        self._lines = None
+        self._stripped_lines = None
+
+    def _split(self):
+        """Returns the lines of the config, splitting the text on first use.
+        """
+        if self._lines is None:
+            self._lines = tuple(self._text.splitlines())
+            self._text = None
+        return self._lines
+
+    def lines(self):
+        """Returns the lines of the config as a new list.
+        """
+        return list(self._split())
+
+    def __iter__(self):
+        return iter(self._split())
+
+    def __len__(self):
+        return len(self._split())
+
+    def __bool__(self):
+        if self._lines is None:
+            return bool(self._text)
+        return bool(self._lines)
+
+    def __str__(self):
+        return str(self.lines())
+
+    def __contains__(self, line):
+        # A line that is not found once stripped cannot be in the config,
+        # so only possible matches are looked for in the lines
+        if isinstance(line, str) and not self.has_stripped_line(line.strip()):
+            return False
+        return line in self._split()
+
+    def has_stripped_line(self, line):
+        """Returns True if line matches a line of the config once leading
+        and trailing whitespace is removed.
+        """
+        if self._stripped_lines is None:
+            self._stripped_lines = frozenset(
+                config_line.strip() for config_line in self._split())
+        return line in self._stripped_lines
+
+
+# ---------------- Keyword 'is' and its equivalents ---------------- #
+def _is(key, returned, match, msg=None):
+    # Fail if the returned value does not equal the match value. Values
+    # that are already equal are not converted to a string.
+    if returned == match:
+        return
+    if not isinstance(returned, str):
+        returned = str(returned)
+    if returned != match:
+        raise RuntimeError(
+            msg or '{}Key: \'{}\', Found: \'{}\', Expected: \'{}\''
+            .format(AE_ERR, key, returned, match)
+        )
+
+
+# ---------------- Keyword 'is not' and its equivalents ---------------- #
+def _is_not(key, returned, match, msg=None):
+    # Fail if the returned value does equals the match value, comparing it
+    # as a string only when it is not already equal
+    if returned != match and not isinstance(returned, str):
+        returned = str(returned)
+    if returned == match:
+        raise RuntimeError(
+            msg or '{}Key: \'{}\', Found: \'{}\', Expected to not be: \'{}\''
+            .format(AE_ERR, key, returned, match)
+        )
+
+
+# ---------------- Keyword 'empty' and its equivalents ---------------- #
+def _empty(key, returned, match, msg=None):
+    if returned:
+        raise RuntimeError(
+            msg or '{}Key: \'{}\', Found: \'{}\', Expected to be empty.'
+            .format(AE_ERR, key, returned)
+        )
+
+
+# ---------------- Keyword 'not empty' and its equivalents ---------------- #
+def _not_empty(key, returned, match, msg=None):
+    if not returned:
+        raise RuntimeError(
+            msg or '{}Key: \'{}\', Found: \'{}\', Expected to not be empty.'
+            .format(AE_ERR, key, returned)
+        )
+
+
+# ---------------- Keyword 'starts with' and equivalents ---------------- #
+def _starts_with(key, returned, match, msg=None):
+    # Fail if the returned value does not start with the match value
+    if not isinstance(returned, str):
+        returned = str(returned)
+    if not returned.startswith(match):
+        raise RuntimeError(
+            msg or '{}Key: \'{}\', Found: \'{}\', Expected to start with: \'{}\''
+            .format(AE_ERR, key, returned, match)
+        )
+
+
+def _by_type(text, lines, keys=None):
+    """Returns a table of the given handlers keyed by the exact type of
+    returned value each one deals with. Looking up type(returned) replaces
+    a chain of isinstance checks on every call.
+    """
+    table = {str: text, list: lines, _ConfigText: lines}
+    if keys is not None:
+        table[dict] = keys
+    return table
+
+
+def _handler(table, returned):
+    """Returns the handler in table for the type of returned, or None if it
+    is not a type the table deals with. The exact type is tried first;
+    subclasses of the listed types are only looked for when that misses.
+    """
+    handler = table.get(type(returned))
+    if handler is None:
+        for base, base_handler in table.items():
+            if isinstance(returned, base):
+                return base_handler
+    return handler
+
+
+# ---------------- Keyword 'contains' and equivalents ---------------- #
+def _text_contains(key, returned, match, msg=None):
+    # If we have a string, fail if the returned value
+    # does not contain the match value
+    if match not in returned:
+        raise RuntimeError(
+            msg or '{}Key: \'{}\', Found: \'{}\', Expected to contain: \'{}\''
+            .format(AE_ERR, key, returned, match)
+        )
+
+
+def _lines_contain(key, returned, match, msg=None):
+    # If we have a list, fail if the match value is not in the list
+    if match not in returned:
+        raise RuntimeError(
+            msg or '{}Did not find \'{}\' in \'{}\''.format(
+                AE_ERR, match, key)
+        )
+
+
+def _keys_contain(key, returned, match, msg=None):
+    # If we have a dict, fail if match value is not a key in the dict
+    if match not in returned:
+        raise RuntimeError(
+            msg or '{}Did not find key \'{}\' in \'{}\''.format(
+                AE_ERR, match, list(returned.keys()))
+        )
+
+
+_CONTAINS_HANDLERS = _by_type(_text_contains, _lines_contain, _keys_contain)
+
+
+def _contains(key, returned, match, msg=None):
+    handler = _handler(_CONTAINS_HANDLERS, returned)
+    if handler is None:
+        # Not sure what type of return value we have
+        raise RuntimeError(msg or AE_ERR_UNKNOWN_TYPE)
+    handler(key, returned, match, msg)
+
+
+# --------------- Keyword 'does not contain' and equivalents ------------ #
+def _text_does_not_contain(key, returned, match, msg=None):
+    # If we have a string, fail if the returned value
+    # contains the match value as a substring
+    if match in returned:
+        raise RuntimeError(
+            msg or '{}Key: \'{}\', Found: \'{}\', '
+            'Expected to not contain: \'{}\''
+            .format(AE_ERR, key, returned, match)
+        )
+
+
+def _lines_do_not_contain(key, returned, match, msg=None):
+    # If we have a list, fail if the match value is in the list
+    if match in returned:
+        raise RuntimeError(
+            msg or '{}Found \'{}\' in \'{}\''.format(
+                AE_ERR, match, key)
+        )
+
+
+def _keys_do_not_contain(key, returned, match, msg=None):
+    # If we have a dict, fail if the match value is a key in the dict
+    if match in returned:
+        raise RuntimeError(
+            msg or '{}Found key \'{}\' in \'{}\''.format(
+                AE_ERR, match, list(returned.keys()))
+        )
+
+
+_DOES_NOT_CONTAIN_HANDLERS = _by_type(
+    _text_does_not_contain, _lines_do_not_contain, _keys_do_not_contain)
+
+
+def _does_not_contain(key, returned, match, msg=None):
+    handler = _handler(_DOES_NOT_CONTAIN_HANDLERS, returned)
+    if handler is None:
+        # Not sure what type of return value we have
+        raise RuntimeError(msg or AE_ERR_UNKNOWN_TYPE)
+    handler(key, returned, match, msg)
+
+
+# -------------- Keyword 'contains line' and equivalents --------------- #
+def _text_contains_line(key, returned, match, msg=None):
+    # If we have a string, fail if the returned value
+    # does not equal the match value
+    if returned.strip() != match:
+        raise RuntimeError(
+            msg or '{}Key: \'{}\', Found: \'{}\', Expected to be: \'{}\''
+            .format(AE_ERR, key, returned, match)
+        )
+
+
+def _lines_contain_line(key, returned, match, msg=None):
+    # If we have a list, fail if the match value is not in the list.
+    # Config output can answer an exact line match without a scan.
+    if isinstance(returned, _ConfigText) and \
+            returned.has_stripped_line(match):
+        return
+    regex = _line_pattern(match)
+    if not any(regex.search(line) for line in returned):
+        raise RuntimeError(
+            msg or '{}Did not find \'{}\' in \'{}\''.format(
+                AE_ERR, match, key)
+        )
+
+
+_CONTAINS_LINE_HANDLERS = _by_type(_text_contains_line, _lines_contain_line)
+
+
+def _contains_line(key, returned, match, msg=None):
+    handler = _handler(_CONTAINS_LINE_HANDLERS, returned)
+    if handler is None:
+        # Not sure what type of return value we have
+        raise RuntimeError(msg or AE_ERR_UNKNOWN_TYPE)
+    handler(key, returned, match, msg)
+
+
+# --------------- Keyword 'does not contain line' and equivalents ------- #
+def _text_is_not_line(key, returned, match, msg=None):
+    # If we have a string, fail if the returned value
+    # equals the match value
+    if returned == match:
+        raise RuntimeError(
+            msg or '{}Found \'{}\' in key \'{}\', Expected to not be found'
+            .format(AE_ERR, match, key)
+        )
+
+
+def _lines_do_not_contain_line(key, returned, match, msg=None):
+    # If we have a list, fail if the list contains the match value
+    if match in returned:
+        raise RuntimeError(
+            msg or '{}Found \'{}\' in \'{}\''.format(AE_ERR, match, key)
+        )
+
+
+_DOES_NOT_CONTAIN_LINE_HANDLERS = _by_type(
+    _text_is_not_line, _lines_do_not_contain_line)
+
+
+def _does_not_contain_line(key, returned, match, msg=None):
+    handler = _handler(_DOES_NOT_CONTAIN_LINE_HANDLERS, returned)
+    if handler is None:
+        # Not sure what type of return value we have
+        raise RuntimeError(msg or AE_ERR_UNKNOWN_TYPE)
+    handler(key, returned, match, msg)
+
+
+# ---------------- Keyword 'greater' and its equivalents ---------------- #
+def _greater(key, returned, match, msg=None):
+    # Fail if the returned value is not greater than the match value.
+    # Also fail if the match value provided or the return value for
+    # the given key are not an int or float.
+    if not isinstance(returned, int) or not isinstance(returned, float):
+        try:
+            returned = int(returned)
+        except ValueError as e:
+            if 'invalid literal for int()' in str(e):
+                try:
+                    returned = float(returned)
+                except ValueError as e:
+                    if 'could not convert string to float' in str(e):
+                        raise RuntimeError(
+                            '{}Key: \'{}\', Returned: \'{}\', must compare to an int or float.'
+                            .format(AE_ERR, key, returned)
+                        )
+    if not isinstance(match, int) or not isinstance(match, float):
+        try:
+            match = int(match)
+        except ValueError as e:
+            if 'invalid literal for int()' in str(e):
+                try:
+                    match = float(match)
+                except ValueError as e:
+                    if 'could not convert string to float' in str(e):
+                        raise RuntimeError(
+                            '{}Key: \'{}\', Match: \'{}\', must provide an int or float as a match value.'
+                            .format(AE_ERR, key, match)
+                        )
+    if returned <= match:
+        raise RuntimeError(
+            msg or '{}Key: \'{}\', Found: \'{}\', Should be greater than: \'{}\''
+            .format(AE_ERR, key, returned, match)
+        )
+
+
+# ---------------- Keyword 'less' and its equivalents ---------------- #
+def _less(key, returned, match, msg=None):
+    # Fail if the returned value is not less than the match value.
+    # Also fail if the match value provided or the return value for
+    # the given key are not an int or float.
+    if not isinstance(returned, int) or not isinstance(returned, float):
+        try:
+            returned = int(returned)
+        except ValueError as e:
+            if 'invalid literal for int()' in str(e):
+                try:
+                    returned = float(returned)
+                except ValueError as e:
+                    if 'could not convert string to float' in str(e):
+                        raise RuntimeError(
+                            '{}Key: \'{}\', Returned: \'{}\', must compare to an int or float.'
+                            .format(AE_ERR, key, returned)
+                        )
+    if not isinstance(match, int) or not isinstance(match, float):
+        try:
+            match = int(match)
+        except ValueError as e:
+            if 'invalid literal for int()' in str(e):
+                try:
+                    match = float(match)
+                except ValueError as e:
+                    if 'could not convert string to float' in str(e):
+                        raise RuntimeError(
+                            '{}Key: \'{}\', Match: \'{}\', must provide an int or float as a match value.'
+                            .format(AE_ERR, key, match)
+                        )
+    if returned >= match:
+        raise RuntimeError(
+            msg or '{}Key: \'{}\', Found: \'{}\', Should be less than: \'{}\''
+            .format(AE_ERR, key, returned, match)
+        )
+
+
+# Match types, with spaces replaced by underscores, mapped to the function
+# implementing each one
+_MATCHERS = {
+    'is': _is,
+    'is_equal_to': _is,
+    'isequalto': _is,
+    'equals': _is,
+    'to_be': _is,
+    'tobe': _is,
+    'is_not': _is_not,
+    'isnot': _is_not,
+    'is_not_equal_to': _is_not,
+    'isnotequalto': _is_not,
+    'to_not_be': _is_not,
+    'tonotbe': _is_not,
+    'empty': _empty,
+    'is_empty': _empty,
+    'isempty': _empty,
+    'not_empty': _not_empty,
+    'is_not_empty': _not_empty,
+    'isnotempty': _not_empty,
+    'starts_with': _starts_with,
+    'startswith': _starts_with,
+    'begins_with': _starts_with,
+    'beginswith': _starts_with,
+    'contains': _contains,
+    'to_contain': _contains,
+    'tocontain': _contains,
+    'does_not_contain': _does_not_contain,
+    'doesnotcontain': _does_not_contain,
+    'to_not_contain': _does_not_contain,
+    'tonotcontain': _does_not_contain,
+    'contains_line': _contains_line,
+    'containsline': _contains_line,
+    'to_contain_line': _contains_line,
+    'tocontainline': _contains_line,
+    'does_not_contain_line': _does_not_contain_line,
+    'doesnotcontainline': _does_not_contain_line,
+    'to_not_contain_line': _does_not_contain_line,
+    'tonotcontainline': _does_not_contain_line,
+    'greater': _greater,
+    'is_greater': _greater,
+    'isgreater': _greater,
+    'is_greater_than': _greater,
+    'isgreaterthan': _greater,
+    'greater_than': _greater,
+    'greaterthan': _greater,
+    'less': _less,
+    'is_less': _less,
+    'isless': _less,
+    'is_less_than': _less,
+    'islessthan': _less,
+    'less_than': _less,
+    'lessthan': _less,
+}
+# Also accept the match types as they are written in the documentation, so
+# the usual spellings are found without being normalised first
+_MATCHERS.update([(name.replace('_', ' '), func)
+                  for name, func in list(_MATCHERS.items())])
 
 
 class Expect(object):
@@ -86,6 +580,13 @@ class Expect(object):
             | Library | AristaLibrary |
             | Library | AristaLibrary.Expect |
 
+            # Reuse stored command output that is less than 30 seconds
+            # old instead of executing the command again. By default the
+            # command is executed every time.
+            *** Settings ***
+            | Library | AristaLibrary |
+            | Library | AristaLibrary.Expect | cache_ttl=30 |
+
         Instruct the library to execute commands on devices and store
         the output of those commands:
 
@@ -192,9 +693,15 @@ class Expect(object):
     ROBOT_LIBRARY_SCOPE = 'TEST_SUITE'
     ROBOT_LIBRARY_VERSION = VERSION
 
-    def __init__(self, cmd=None):
+    __slots__ = ('import_cmd', 'cache_ttl', 'arista_lib', 'switch_cmd',
+                 'result', '_output_cache', '_batched_output', '_batch')
+
+    def __init__(self, cmd=None, cache_ttl=None):
         # Store the command passed in when the library is imported
         self.import_cmd = cmd
+        # Seconds for which stored command output may be reused, or None to
+        # execute the command every time
+        self.cache_ttl = float(cache_ttl) if cache_ttl is not None else None
         # Get the AristaLibrary instance in use so we can reference
         # the list of connections
         try:
@@ -205,6 +712,17 @@ class Expect(object):
         # Initialize the switch_cmd and result dictionaries as empty
         self.switch_cmd = {}
         self.result = {}
+        # Time fetched and output of string commands, keyed by
+        # (switch connection, command). The connection is used rather than
+        # its index, since indexes are reused once connections are cleared.
+        self._output_cache = {}
+        # Output of commands sent by Flush Command Batch that has not been
+        # asked for yet, keyed like _output_cache. It is dropped as soon as
+        # a command is sent to a switch outside of a batch.
+        self._batched_output = {}
+        # Commands waiting to be sent, keyed by switch index, while a
+        # command batch is open
+        self._batch = None
 
     # ---------------- Start Core Keywords ---------------- #
 
@@ -213,7 +731,10 @@ class Expect(object):
         output from the command in the Arista Expect object. If no switch_id
         is given, the command will be executed on all available switches.
         If no command is given, the previous command saved for each switch
-        will be executed again.
+        will be executed again. If the library was imported with cache_ttl,
+        output fetched for the same command on a switch less than cache_ttl
+        seconds ago is reused instead; use Refresh Command Output to execute
+        the command regardless.
 
         Args:
             switch_id (int, optional): The index id for a specific switch
@@ -227,84 +748,229 @@ class Expect(object):
 
         NOTE: The result of the command is not accessible to the test cases
         within a test suite that imports the Arista Expect library. All tests
-        must be processed using an Arista Expect-style keyword.
+        must be processed using an Arista Expect-style keyword. The output of
+        'show *-config' commands is stored as config text that can be
+        searched and iterated over but not indexed, rather than as a list of
+        lines; use Get Value with the 'config' key to get the list.
         """
+        self._forget_closed_connections()
         # Convert the passed in switch_id to the actual switch indexes
         # to be used as keys for storing the results. Use all switches
         # if switch_id is not specified.
         if switch_id:
-            switch_list = [self.arista_lib.get_switch(switch_id)]
+            # A single switch is made the active switch and handled directly
+            index = self.arista_lib.get_switch(switch_id)['index']
+            self.arista_lib.change_to_switch(index)
+            self._process_switch(index, cmd)
+            return self.result
+
+        indexes = [switch['index'] for switch in self.arista_lib.get_switches()]
+        commands = {}
+        fetch = []
+        for index in indexes:
+            commands[index] = self._resolve_command(index, cmd)
+            # Switches without a command are left without a result
+            if commands[index] and \
+                    not self._use_stored_output(index, commands[index]):
+                fetch.append(index)
+
+        # Output left over from a command batch is only handed out until
+        # the switches are queried again
+        if fetch:
+            self._batched_output.clear()
+
+        # Query the switches at the same time, addressing each one by its
+        # index instead of going through the active switch.
+        outputs = self._run_on_switches(
+            dict((index, commands[index]) for index in fetch))
+        for index, output in outputs.items():
+            self._store_output(index, commands[index], output)
+
+        if indexes:
+            # Leave the last switch active, as if they had been queried in
+            # turn.
+            self.arista_lib.change_to_switch(indexes[-1])
+
+        return self.result
+
+    def _process_switch(self, index, cmd):
+        """Determines the command for the switch at index and stores its
+        output, running the command if needed.
+        """
+        run_cmd = self._resolve_command(index, cmd)
+        # A switch without a command is left without a result
+        if run_cmd and not self._use_stored_output(index, run_cmd):
+            self._batched_output.clear()
+            self._store_output(index, run_cmd,
+                               self._run_on_switch(index, run_cmd))
+
+    def _resolve_command(self, index, cmd):
+        """Returns the command to run on the switch at index, remembering
+        it as the command for that switch, and clears its stored result.
+        """
+        # Determine what command is to be executed.
+        # Command priority:
+        #   1. cmd parameter passed to this method
+        #   2. last used command on this switch (switch_cmds)
+        #   3. cmd parameter passed to the library import (import_cmd)
+        #   4. None - result value with remain unset
+        if cmd:
+            # set run_cmd and switch_cmd for this index to cmd parameter
+            run_cmd = self.switch_cmd[index] = cmd
+        elif index in self.switch_cmd and self.switch_cmd[index]:
+            # value is already stored, just set run_cmd
+            run_cmd = self.switch_cmd[index]
+        elif self.import_cmd:
+            # set run_cmd and switch_cmd for this index to import_cmd
+            run_cmd = self.switch_cmd[index] = self.import_cmd
         else:
-            switch_list = self.arista_lib.get_switches()
-
-        for switch in switch_list:
-            index = switch['index']
-            run_cmd = None
-            # Determine what command is to be executed.
-            # Command priority:
-            #   1. cmd parameter passed to this method
-            #   2. last used command on this switch (switch_cmds)
-            #   3. cmd parameter passed to the library import (import_cmd)
-            #   4. None - result value with remain unset
-            if cmd:
-                # set run_cmd and switch_cmd for this index to cmd parameter
-                run_cmd = self.switch_cmd[index] = cmd
-            elif index in self.switch_cmd and self.switch_cmd[index]:
-                # value is already stored, just set run_cmd
-                run_cmd = self.switch_cmd[index]
-            elif self.import_cmd:
-                # set run_cmd and switch_cmd for this index to import_cmd
-                run_cmd = self.switch_cmd[index] = self.import_cmd
-            else:
-                # set run_cmd and switch_cmd for this index to None
-                run_cmd = self.switch_cmd[index] = None
+            # set run_cmd and switch_cmd for this index to None
+            run_cmd = self.switch_cmd[index] = None
 
-            # Clear any existing result
-            self.result[index] = None
+        # Clear any existing result
+        self.result[index] = None
+        return run_cmd
 
-            self.arista_lib.change_to_switch(index)
+    def _use_stored_output(self, index, run_cmd):
+        """Returns True if run_cmd does not need to be sent to the switch at
+        index now, either because its stored output was reused or because
+        it was added to the open command batch.
+        """
+        if not self._is_cacheable(run_cmd):
+            return False
+        key = self._output_key(index, run_cmd)
+        if key in self._batched_output:
+            self.result[index] = self._batched_output.pop(key)
+            return True
+        if self._is_fresh(key):
+            self.result[index] = self._output_cache[key][1]
+            return True
+        if self._batch is not None:
+            queued = self._batch.setdefault(index, [])
+            if run_cmd not in queued:
+                queued.append(run_cmd)
+            return True
+        return False
+
+    def _store_output(self, index, run_cmd, output):
+        """Stores output as the result for the switch at index, keeping it
+        for reuse if run_cmd is a string command.
+        """
+        self.result[index] = output
+        if self.cache_ttl is not None and self._is_cacheable(run_cmd):
+            self._output_cache[self._output_key(index, run_cmd)] = (
+                time.time(), output)
+
+    def _run_batch(self, batch):
+        """Sends the commands queued in batch for each switch index, in one
+        request per switch for each encoding, and returns a dictionary of
+        the output of each command keyed by switch index.
+        """
+        by_encoding = {}
+        for index, cmds in batch.items():
+            for run_cmd in cmds:
+                encoding = self._encoding_for(run_cmd)
+                by_encoding.setdefault(encoding, {}).setdefault(
+                    index, []).append(run_cmd)
+        outputs = dict((index, {}) for index in batch)
+        for encoding, switch_cmds in by_encoding.items():
+            replies = self.arista_lib.enable_on_switches(switch_cmds, encoding)
+            for index, reply in replies.items():
+                for run_cmd, response in zip(switch_cmds[index], reply):
+                    outputs[index][run_cmd] = self._output_from(response,
+                                                                encoding)
+        return outputs
+
+    def _is_cacheable(self, run_cmd):
+        """Only the output of plain string commands is cached.
+        """
+        return isinstance(run_cmd, str) and bool(run_cmd)
 
-            if isinstance(run_cmd, dict) or isinstance(run_cmd, list):
-                # Command is user specified. Send the command to the switch
-                # and store the result as a dictionary.
-                reply = self.arista_lib.enable(run_cmd, version=version)
-                self.result[index] = reply[0]['result']
-            else:
-                # Command is a string. See if it matches a special case
-                if run_cmd == 'show startup-config':
-                    # Command is 'show startup-config'. Get the startup config
-                    # from the AristaLibrary object after refreshing the
-                    # state of the configs stored in the object.
-                    self.arista_lib.refresh()
-                    reply = self.arista_lib.get_startup_config()
-                    self.result[index] = reply.split('\n')
-                elif run_cmd == 'show running-config all':
-                    # Command is 'show running-config all'. Get the running config
-                    # from the AristaLibrary object after refreshing the
-                    # state of the configs stored in the object.
-                    self.arista_lib.refresh()
-                    reply = self.arista_lib.get_running_config()
-                    self.result[index] = reply.split('\n')
-                elif re.match(r'^show (startup|running)-config.*$', run_cmd):
-                    # Command is a 'show *-config' that does not map directly
-                    # to an AristaLibrary object attribute. Send the command
-                    # to the switch and store the reply as a list.
-                    reply = self.arista_lib.enable(run_cmd, encoding='text')
-                    self.result[index] = reply[0]['result']['output'].split('\n')
-                elif run_cmd:
-                    # Command is user specified. Send the command to the switch
-                    # and store the result as a dictionary.
-                    reply = self.arista_lib.enable(run_cmd)
-                    self.result[index] = reply[0]['result']
+    def _is_fresh(self, key):
+        """Returns True if output is stored for key and is recent enough
+        to be reused.
+        """
+        if self.cache_ttl is None or key not in self._output_cache:
+            return False
+        return time.time() - self._output_cache[key][0] < self.cache_ttl
 
-        return self.result
+    def _output_key(self, index, run_cmd):
+        """Returns the key under which the output of run_cmd on the switch
+        at index is stored.
+        """
+        return (self.arista_lib.get_switch(index)['node'], run_cmd)
+
+    def _forget_closed_connections(self):
+        """Drops the stored output of connections that are no longer open.
+        """
+        nodes = set(switch['node'] for switch in self.arista_lib.get_switches())
+        for store in (self._output_cache, self._batched_output):
+            for key in [k for k in store if k[0] not in nodes]:
+                del store[key]
+
+    def _clear_output_cache(self, switch_id=None):
+        """Forget the cached command output of the named switch, or of all
+        switches if no switch_id is given.
+        """
+        if switch_id:
+            node = self.arista_lib.get_switch(switch_id)['node']
+            for store in (self._output_cache, self._batched_output):
+                for key in [k for k in store if k[0] is node]:
+                    del store[key]
+        else:
+            self._output_cache.clear()
+            self._batched_output.clear()
+
+    def _encoding_for(self, run_cmd):
+        """Returns the encoding run_cmd is sent with. A 'show *-config'
+        command is fetched as text, any other command as json.
+        """
+        if isinstance(run_cmd, str) and run_cmd.startswith(SHOW_CONFIG_CMDS):
+            return 'text'
+        return 'json'
+
+    def _output_from(self, response, encoding):
+        """Returns the output to be stored for a command response. The
+        text of a config is kept as _ConfigText, the result of any other
+        command as a dictionary.
+        """
+        if encoding == 'text':
+            return _ConfigText(response['result']['output'])
+        return response['result']
+
+    def _run_on_switch(self, index, run_cmd):
+        """Runs run_cmd on the switch at index and returns the output to be
+        stored as the result for that switch.
+        """
+        encoding = self._encoding_for(run_cmd)
+        reply = self.arista_lib.enable(run_cmd, encoding, switch_id=index)
+        return self._output_from(reply[0], encoding)
+
+    def _run_on_switches(self, commands):
+        """Runs the command given for each switch index in commands on all
+        of those switches at the same time, and returns a dictionary of the
+        output to be stored for each switch.
+        """
+        by_encoding = {}
+        for index, run_cmd in commands.items():
+            encoding = self._encoding_for(run_cmd)
+            by_encoding.setdefault(encoding, {})[index] = run_cmd
+        outputs = {}
+        for encoding, switch_cmds in by_encoding.items():
+            replies = self.arista_lib.enable_on_switches(switch_cmds, encoding)
+            for index, reply in replies.items():
+                outputs[index] = self._output_from(reply[0], encoding)
+        return outputs
 
     def get_command_output_on_device(self, switch_id=None, cmd=None, version=1):
         """Execute the specified command on the named switch and store the
         output from the command in the Arista Expect object. If no switch_id
         is given, the command will be executed on all available switches.
         If no command is given, the previous command saved for each switch
-        will be executed again.
+        will be executed again. If the library was imported with cache_ttl,
+        output fetched for the same command on a switch less than cache_ttl
+        seconds ago is reused instead; use Refresh Command Output to execute
+        the command regardless.
 
         Get Command Output On Device is an alias for Get Command Output.
 
@@ -325,7 +991,10 @@ class Expect(object):
         output from the command in the Arista Expect object. If no switch_id
         is given, the command will be executed on all available switches.
         If no command is given, the previous command saved for each switch
-        will be executed again.
+        will be executed again. If the library was imported with cache_ttl,
+        output fetched for the same command on a switch less than cache_ttl
+        seconds ago is reused instead; use Refresh Command Output to execute
+        the command regardless.
 
         Get Command Output On Devices is an alias for Get Command Output
         without the switch_id argument, resulting in the command being
@@ -350,7 +1019,8 @@ class Expect(object):
         cmd argument may be used to change the command that will be
         executed on the named device.
 
-        Refresh Command Output is an alias for Get Command Output.
+        Refresh Command Output is an alias for Get Command Output,
+        except that the command is always sent to the switch again.
 
         Args:
             switch_id (int, optional): The index id for a specific switch
@@ -362,6 +1032,7 @@ class Expect(object):
                 be reused, or the command used in the library import if
                 no previous command has been sent. Default is None.
         """
+        self._clear_output_cache(switch_id)
         return self.get_command_output(switch_id=switch_id, cmd=cmd, version=version)
 
     def refresh_command_output_on_device(self, switch_id=None, cmd=None, version=1):
@@ -371,7 +1042,8 @@ class Expect(object):
         cmd argument may be used to change the command that will be
         executed on the named device.
 
-        Refresh Command Output On Device is an alias for Get Command Output.
+        Refresh Command Output On Device is an alias for Get Command Output,
+        except that the command is always sent to the switch again.
 
         Args:
             switch_id (int, optional): The index id for a specific switch
@@ -383,6 +1055,7 @@ class Expect(object):
                 be reused, or the command used in the library import if
                 no previous command has been sent. Default is None.
         """
+        self._clear_output_cache(switch_id)
         return self.get_command_output(switch_id=switch_id, cmd=cmd, version=version)
 
     def refresh_command_output_on_devices(self, cmd=None, version=1):
@@ -393,7 +1066,8 @@ class Expect(object):
 
         Refresh Command Output On Devices is an alias for Get Command Output
         without the switch_id argument, resulting in the command being
-        executed on all available switches.
+        executed on all available switches, except that the command is always
+        sent to the switches again.
 
         Args:
             cmd (string, optional): The command string that will be exectuted
@@ -402,8 +1076,61 @@ class Expect(object):
                 be reused, or the command used in the library import if
                 no previous command has been sent. Default is None.
         """
+        self._clear_output_cache()
         return self.get_command_output(cmd=cmd, version=version)
 
+    def begin_command_batch(self):
+        """Start collecting the commands given to the Get Command Output
+        keywords instead of sending each one to the switch right away.
+        Commands whose output is already stored are not collected.
+
+        The output of the collected commands is not available until
+        Flush Command Batch is run. Commands given as a list or dictionary
+        are still sent immediately.
+
+        Example:
+            | Begin Command Batch |
+            | Get Command Output On Devices | cmd=show version |
+            | Get Command Output On Devices | cmd=show interfaces |
+            | Flush Command Batch |
+            | Get Command Output On Devices | cmd=show version |
+            | Expect | modelName | contains | DCS |
+        """
+        if self._batch is None:
+            self._batch = {}
+
+    def flush_command_batch(self):
+        """Send the commands collected since Begin Command Batch, using a
+        single eAPI request per switch for each output encoding, and stop
+        collecting commands.
+
+        The stored result for each switch is set to the output of the last
+        command given for it. The output of the other collected commands is
+        kept, and the next call to Get Command Output for each of them uses
+        it instead of contacting the switch, until a command is sent to a
+        switch outside of a batch.
+        """
+        self._forget_closed_connections()
+        # The batch is only closed once its commands have been sent, so that
+        # they are not lost if sending fails
+        outputs = self._run_batch(self._batch or {})
+        self._batch = None
+        now = time.time()
+        for index, output in outputs.items():
+            # A list or dictionary command was sent right away and its
+            # output is already the result for the switch
+            last_cmd = self.switch_cmd.get(index)
+            for run_cmd, result in output.items():
+                key = self._output_key(index, run_cmd)
+                if self.cache_ttl is not None:
+                    self._output_cache[key] = (now, result)
+                if run_cmd == last_cmd:
+                    # Already handed out as the result for the switch
+                    self.result[index] = result
+                else:
+                    self._batched_output[key] = result
+        return self.result
+
     def record_output(self, switch_id=None, cmd=None, encoding='text'):
         """Log the provided command. If no command is provided then log the
         contents of the currently stored command result. Default is to log
@@ -474,22 +1201,17 @@ class Expect(object):
         # Convert the key into a list of nested keys, and retrieve the
         # value of that nested key from the return data when the key is
         # anything other than 'config' (case-insensitive)
-        keylist = key.split()
-        if key.lower() != 'config':
-            for k in keylist:
-                try:
-                    returned = returned[k]
-                except TypeError as e:
-                    if 'list indices must be integers' in e.message:
-                        returned = returned[int(k)]
-                    else:
-                        raise
+        keylist, lower_key = _parse_key(key)
+        if lower_key != 'config':
+            returned = _lookup(returned, keylist)
+        elif isinstance(returned, _ConfigText):
+            returned = returned.lines()
         return returned
 
     def expect(self, key, match_type, match_value=None, msg=None):
         """This keyword provides a method of testing various types of values
-        within the command output stored after running the 'Initialize Tests
-        On Switch' keyword has been run.
+        within the command output stored by the 'Get Command Output' keyword
+        for the active switch.
 
         Args:
             key (string): The key within the result that will be compared. This
@@ -618,399 +1340,78 @@ class Expect(object):
                         | Expect | config | to not contain line | ip routing | => FAIL
 
         """
-        # Get the index of the currently active switch
-        index = self.arista_lib.get_switch()['index']
-        # Convert the match string parameter into a python method name
-        # prefixed with an underscore and lower case
-        match_string = '_{}'.format(match_type.replace(' ', '_').lower())
-        # Get the current output of the command executed on this switch
-        returned = self.result[index]
-        # Convert the key into a list of nested keys, and retrieve the
-        # value of that nested key from the return data when the key is
-        # anything except 'config' or 'full output' (case-insensitive)
-        keylist = key.split()
-        if key.lower() not in ['config', 'full output']:
-            for k in keylist:
-                try:
-                    returned = returned[k]
-                except TypeError as e:
-                    if 'list indices must be integers' in e.message:
-                        returned = returned[int(k)]
-                    else:
-                        raise
-
-        # Call the method referenced by the match_string, passing in
-        # the values of the keylist, the returned value found by the
-        # keylist, and the expected value to be used for matching
-        try:
-            getattr(self, match_string)(keylist, returned, match_value, msg)
-        except AttributeError:
-            # AttributeError is misleading in this case, since the problem
-            # is that the match_string has not been implemented. Instead,
-            # return a ValueError explaining that the match type is not
-            # implemented.
-            raise ValueError(
-                '{}"{}" is currently not implemented for Expect'
-                .format(AE_ERR, match_type)
-            )
+        # Get the current output of the command executed on the active switch
+        output = self.result[self.arista_lib.get_switch()['index']]
+        self._check(output, key, match_type, match_value, msg)
 
-    # ---------------- Keyword 'is' and its equivalents ---------------- #
+    def expect_many(self, *checks):
+        """This keyword runs several Expect checks against the command output
+        stored for the active switch, and reports every check that failed
+        in a single failure.
 
-    def _is(self, key, returned, match, msg=None):
-        # Fail if the returned value does not equal the match value
-        if not isinstance(returned, str):
-            returned = str(returned)
-        if returned != match:
-            raise RuntimeError(
-                msg or '{}Key: \'{}\', Found: \'{}\', Expected: \'{}\''
-                .format(AE_ERR, key, returned, match)
-            )
-
-    def _is_equal_to(self, key, returned, match, msg=None):
-        return self._is(key, returned, match, msg)
-
-    def _isequalto(self, key, returned, match, msg=None):
-        return self._is(key, returned, match, msg)
-
-    def _equals(self, key, returned, match, msg=None):
-        return self._is(key, returned, match, msg)
-
-    def _to_be(self, key, returned, match, msg=None):
-        return self._is(key, returned, match, msg)
-
-    def _tobe(self, key, returned, match, msg=None):
-        return self._is(key, returned, match, msg)
-
-    # ---------------- Keyword 'is not' and its equivalents ---------------- #
-
-    def _is_not(self, key, returned, match, msg=None):
-        # Fail if the returned value does equals the match value
-        if not isinstance(returned, str):
-            returned = str(returned)
-        if returned == match:
-            raise RuntimeError(
-                msg or '{}Key: \'{}\', Found: \'{}\', Expected to not be: \'{}\''
-                .format(AE_ERR, key, returned, match)
-            )
-
-    def _isnot(self, key, returned, match, msg=None):
-        return self._is_not(key, returned, match, msg)
-
-    def _is_not_equal_to(self, key, returned, match, msg=None):
-        return self._is_not(key, returned, match, msg)
-
-    def _isnotequalto(self, key, returned, match, msg=None):
-        return self._is_not(key, returned, match, msg)
-
-    def _to_not_be(self, key, returned, match, msg=None):
-        return self._is_not(key, returned, match, msg)
-
-    def _tonotbe(self, key, returned, match, msg=None):
-        return self._is_not(key, returned, match, msg)
-
-# ---------------- Keyword 'empty' and its equivalents ---------------- #
-
-    def _empty(self, key, returned, match, msg=None):
-        if returned:
-            raise RuntimeError(
-                msg or '{}Key: \'{}\', Found: \'{}\', Expected to be empty.'
-                .format(AE_ERR, key, returned)
-            )
-
-    def _is_empty(self, key, returned, match, msg=None):
-        return self._empty(key, returned, match, msg)
-
-    def _isempty(self, key, returned, match, msg=None):
-        return self._empty(key, returned, match, msg)
-
-# ---------------- Keyword 'not empty' and its equivalents ---------------- #
-
-    def _not_empty(self, key, returned, match, msg=None):
-        if not returned:
-            raise RuntimeError(
-                msg or '{}Key: \'{}\', Found: \'{}\', Expected to not be empty.'
-                .format(AE_ERR, key, returned)
-            )
-
-    def _is_not_empty(self, key, returned, match, msg=None):
-        return self._not_empty(key, returned, match, msg)
-
-    def _isnotempty(self, key, returned, match, msg=None):
-        return self._not_empty(key, returned, match, msg)
-
-    # ---------------- Keyword 'starts with' and equivalents ---------------- #
-
-    def _starts_with(self, key, returned, match, msg=None):
-        # Fail if the returned value does not start with the match value
-        if not isinstance(returned, str):
-            returned = str(returned)
-        if not returned.startswith(match):
-            raise RuntimeError(
-                msg or '{}Key: \'{}\', Found: \'{}\', Expected to start with: \'{}\''
-                .format(AE_ERR, key, returned, match)
-            )
-
-    def _startswith(self, key, returned, match, msg=None):
-        return self._starts_with(key, returned, match, msg)
-
-    def _begins_with(self, key, returned, match, msg=None):
-        return self._starts_with(key, returned, match, msg)
-
-    def _beginswith(self, key, returned, match, msg=None):
-        return self._starts_with(key, returned, match, msg)
-
-    # ---------------- Keyword 'contains' and equivalents ---------------- #
-
-    def _contains(self, key, returned, match, msg=None):
-        if isinstance(returned, str) or isinstance(returned, unicode):
-            # If we have a (unicode) string, fail if the returned value
-            # does not contain the match value
-            if match not in returned:
-                raise RuntimeError(
-                    msg or '{}Key: \'{}\', Found: \'{}\', Expected to contain: \'{}\''
-                    .format(AE_ERR, key, returned, match)
-                )
-        elif isinstance(returned, list):
-            # If we have a list, fail if the match value is not in the list
-            if match not in returned:
-                raise RuntimeError(
-                    msg or '{}Did not find \'{}\' in \'{}\''.format(
-                        AE_ERR, match, key)
-                )
-        elif isinstance(returned, dict):
-            # If we have a dict, fail if match value is not a key in the dict
-            if match not in returned:
-                raise RuntimeError(
-                    msg or '{}Did not find key \'{}\' in \'{}\''.format(
-                        AE_ERR, match, returned.keys())
-                )
-        else:
-            # Not sure what type of return value we have
-            raise RuntimeError(
-                msg or '{}Unable to determine type of return value'
-                .format(AE_ERR)
-            )
-
-    def _to_contain(self, key, returned, match, msg=None):
-        return self._contains(key, returned, match, msg)
-
-    def _tocontain(self, key, returned, match, msg=None):
-        return self._contains(key, returned, match, msg)
-
-    # --------------- Keyword 'does not contain' and equivalents ------------ #
-
-    def _does_not_contain(self, key, returned, match, msg=None):
-        if isinstance(returned, str) or isinstance(returned, unicode):
-            # If we have a (unicode) string, fail if the returned value
-            # contains the match value as a substring
-            if match in returned:
-                raise RuntimeError(
-                    msg or '{}Key: \'{}\', Found: \'{}\', '
-                    'Expected to not contain: \'{}\''
-                    .format(AE_ERR, key, returned, match)
-                )
-        elif isinstance(returned, list):
-            # If we have a list, fail if the match value is in the list
-            if match in returned:
-                raise RuntimeError(
-                    msg or '{}Found \'{}\' in \'{}\''.format(
-                        AE_ERR, match, key)
-                )
-        elif isinstance(returned, dict):
-            # If we have a dict, fail if the match value is a key in the dict
-            if match in returned:
-                raise RuntimeError(
-                    msg or '{}Found key \'{}\' in \'{}\''.format(
-                        AE_ERR, match, returned.keys())
-                )
-        else:
-            # Not sure what type of return value we have
-            raise RuntimeError(
-                '{}Unable to determine type of return value'.format(AE_ERR)
-            )
-
-    def _doesnotcontain(self, key, returned, match, msg=None):
-        return self._does_not_contain(key, returned, match, msg)
-
-    def _to_not_contain(self, key, returned, match, msg=None):
-        return self._does_not_contain(key, returned, match, msg)
-
-    def _tonotcontain(self, key, returned, match, msg=None):
-        return self._does_not_contain(key, returned, match, msg)
-
-    # -------------- Keyword 'contains line' and equivalents --------------- #
-
-    def _contains_line(self, key, returned, match, msg=None):
-        if isinstance(returned, str) or isinstance(returned, unicode):
-            # If we have a (unicode) string, fail if the returned value
-            # does not equal the match value
-            if returned.strip() != match:
-                raise RuntimeError(
-                    msg or '{}Key: \'{}\', Found: \'{}\', Expected to be: \'{}\''
-                    .format(AE_ERR, key, returned, match)
-                )
-        elif isinstance(returned, list):
-            # If we have a list, fail if the match value is not in the list
-            regex = re.compile("\s*{}".format(match))
-            matches = [m.group(0) for line in returned for m in
-                       [regex.search(line)] if m]
-            if not matches:
-                raise RuntimeError(
-                    msg='{}Did not find \'{}\' in \'{}\''.format(AE_ERR, match,
-                                                                 key)
-                )
-        else:
-            # Not sure what type of return value we have
-            raise RuntimeError(
-                '{}Unable to determine type of return value'.format(AE_ERR)
-            )
-
-    def _to_contain_line(self, key, returned, match, msg=None):
-        return self._contains_line(key, returned, match, msg)
+        Args:
+            checks (lists): Each check is a list holding the arguments of
+                one Expect: the key, the match type and, when the match
+                type needs them, the match value and msg.
 
-    def _tocontainline(self, key, returned, match, msg=None):
-        return self._contains_line(key, returned, match, msg)
+        Checks whose key is not found in the output or whose match type is
+        not implemented are reported as failures along with the others.
 
-    # --------------- Keyword 'does not contain line' and equivalents ------- #
+        Examples:
+            | ${mtu}=       | Create List | interfaces Ethernet1 mtu | is | 1500 |
+            | ${desc}=      | Create List | interfaces Ethernet1 description | is empty |
+            | Expect Many   | ${mtu}      | ${desc} |
 
-    def _does_not_contain_line(self, key, returned, match, msg=None):
-        if isinstance(returned, str) or isinstance(returned, unicode):
-            # If we have a (unicode) string, fail if the returned value
-            # equals the match value
-            if returned == match:
-                raise RuntimeError(
-                    msg or '{}Found \'{}\' in key \'{}\', Expected to not be found'
-                    .format(AE_ERR, match, key)
-                )
-        elif isinstance(returned, list):
-            # If we have a list, fail if the list contains the match value
-            if match in returned:
-                raise RuntimeError(
-                    msg or '{}Found \'{}\' in \'{}\''.format(AE_ERR, match, key)
+        """
+        for check in checks:
+            if not isinstance(check, (list, tuple)) or \
+                    not 2 <= len(check) <= 4:
+                raise ValueError(
+                    '{}Each Expect Many check must be a list of a key, a '
+                    'match type and optionally a match value and msg, got '
+                    '\'{}\''.format(AE_ERR, check)
                 )
-        else:
-            # Not sure what type of return value we have
-            raise RuntimeError(
-                '{}Unable to determine type of return value'.format(AE_ERR)
-            )
-
-    def _doesnotcontainline(self, key, returned, match, msg=None):
-        return self._does_not_contain_line(key, returned, match, msg)
-
-    def _to_not_contain_line(self, key, returned, match, msg=None):
-        return self._does_not_contain_line(key, returned, match, msg)
-
-    def _tonotcontainline(self, key, returned, match, msg=None):
-        return self._does_not_contain_line(key, returned, match, msg)
-
-    # ---------------- Keyword 'greater' and its equivalents ---------------- #
-
-    def _greater(self, key, returned, match, msg=None):
-        # Fail if the returned value is not greater than the match value.
-        # Also fail if the match value provided or the return value for
-        # the given key are not an int or float.
-        if not isinstance(returned, int) or not isinstance(returned, float):
+        output = self.result[self.arista_lib.get_switch()['index']]
+        failures = []
+        for check in checks:
             try:
-                returned = int(returned)
-            except ValueError as e:
-                if 'invalid literal for int()' in e.message:
-                    try:
-                        returned = float(returned)
-                    except ValueError as e:
-                        if 'could not convert string to float' in e.message:
-                            raise RuntimeError(
-                                '{}Key: \'{}\', Returned: \'{}\', must compare to an int or float.'
-                                .format(AE_ERR, key, returned)
-                            )
-        if not isinstance(match, int) or not isinstance(match, float):
-            try:
-                match = int(match)
-            except ValueError as e:
-                if 'invalid literal for int()' in e.message:
-                    try:
-                        match = float(match)
-                    except ValueError as e:
-                        if 'could not convert string to float' in e.message:
-                            raise RuntimeError(
-                                '{}Key: \'{}\', Match: \'{}\', must provide an int or float as a match value.'
-                                .format(AE_ERR, key, match)
-                            )
-        if returned <= match:
+                self._check(output, *check)
+            except RuntimeError as e:
+                failures.append(str(e))
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                # A missing key or an unknown match type fails the check
+                # without stopping the others
+                failures.append('{}Key: \'{}\', {}: {}'.format(
+                    AE_ERR, check[0], type(e).__name__, e))
+        if failures:
             raise RuntimeError(
-                msg or '{}Key: \'{}\', Found: \'{}\', Should be greater than: \'{}\''
-                .format(AE_ERR, key, returned, match)
+                '{}{} of {} checks failed:\n{}'.format(
+                    AE_ERR, len(failures), len(checks), '\n'.join(failures))
             )
 
-    def _is_greater(self, key, returned, match, msg=None):
-        return self._greater(key, returned, match, msg)
-
-    def _isgreater(self, key, returned, match, msg=None):
-        return self._greater(key, returned, match, msg)
-
-    def _is_greater_than(self, key, returned, match, msg=None):
-        return self._greater(key, returned, match, msg)
-
-    def _isgreaterthan(self, key, returned, match, msg=None):
-        return self._greater(key, returned, match, msg)
-
-    def _greater_than(self, key, returned, match, msg=None):
-        return self._greater(key, returned, match, msg)
-
-    def _greaterthan(self, key, returned, match, msg=None):
-        return self._greater(key, returned, match, msg)
-
-    # ---------------- Keyword 'less' and its equivalents ---------------- #
-
-    def _less(self, key, returned, match, msg=None):
-        # Fail if the returned value is not less than the match value.
-        # Also fail if the match value provided or the return value for
-        # the given key are not an int or float.
-        if not isinstance(returned, int) or not isinstance(returned, float):
-            try:
-                returned = int(returned)
-            except ValueError as e:
-                if 'invalid literal for int()' in e.message:
-                    try:
-                        returned = float(returned)
-                    except ValueError as e:
-                        if 'could not convert string to float' in e.message:
-                            raise RuntimeError(
-                                '{}Key: \'{}\', Returned: \'{}\', must compare to an int or float.'
-                                .format(AE_ERR, key, returned)
-                            )
-        if not isinstance(match, int) or not isinstance(match, float):
-            try:
-                match = int(match)
-            except ValueError as e:
-                if 'invalid literal for int()' in e.message:
-                    try:
-                        match = float(match)
-                    except ValueError as e:
-                        if 'could not convert string to float' in e.message:
-                            raise RuntimeError(
-                                '{}Key: \'{}\', Match: \'{}\', must provide an int or float as a match value.'
-                                .format(AE_ERR, key, match)
-                            )
-        if returned >= match:
-            raise RuntimeError(
-                msg='{}Key: \'{}\', Found: \'{}\', Should be less than: \'{}\''
-                .format(AE_ERR, key, returned, match)
+    def _check(self, output, key, match_type, match_value=None, msg=None):
+        """Compares the value of key in output with match_value using
+        match_type, as described for Expect.
+        """
+        # Look up the function implementing the match type, normalising
+        # the match type only when it is not found as given
+        matcher = _MATCHERS.get(match_type)
+        if matcher is None:
+            matcher = _MATCHERS.get(match_type.replace(' ', '_').lower())
+        if matcher is None:
+            raise ValueError(
+                '{}"{}" is currently not implemented for Expect'
+                .format(AE_ERR, match_type)
             )
-
-    def _is_less(self, key, returned, match, msg=None):
-        return self._less(key, returned, match, msg)
-
-    def _isless(self, key, returned, match, msg=None):
-        return self._less(key, returned, match, msg)
-
-    def _is_less_than(self, key, returned, match, msg=None):
-        return self._less(key, returned, match, msg)
-
-    def _islessthan(self, key, returned, match, msg=None):
-        return self._less(key, returned, match, msg)
-
-    def _less_than(self, key, returned, match, msg=None):
-        return self._less(key, returned, match, msg)
-
-    def _lessthan(self, key, returned, match, msg=None):
-        return self._less(key, returned, match, msg)
+        # Convert the key into a list of nested keys, and retrieve the
+        # value of that nested key from the output when the key is
+        # anything except 'config' or 'full output' (case-insensitive)
+        returned = output
+        keylist, lower_key = _parse_key(key)
+        if lower_key not in ('config', 'full output'):
+            returned = _lookup(returned, keylist)
+
+        # Call the matcher, passing in the values of the keylist, the
+        # returned value found by the keylist, and the expected value to be
+        # used for matching
+        matcher(keylist, returned, match_value, msg)
@@ -1,4 +1,4 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 
 import sys
 import os
@@ -14,11 +14,11 @@ if __name__ == '__main__':
     try:
         libdoc(ipath, opath)
     except (IndexError, KeyError):
-        print __doc__
+        print(__doc__)
 
     ipath = os.path.join(ROOT, 'AristaLibrary', 'Expect.py')
     opath = os.path.join(ROOT, 'docs', 'Expect.html')
     try:
         libdoc(ipath, opath)
     except (IndexError, KeyError):
-        print __doc__
+        print(__doc__)
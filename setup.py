@@ -38,7 +38,8 @@ from os.path import abspath, dirname, join
 CURDIR = dirname(abspath(__file__))
 
 #from AristaLibrary import __version__, __author__
-execfile(join(CURDIR, 'AristaLibrary', 'version.py'))
+with open(join(CURDIR, 'AristaLibrary', 'version.py')) as version:
+    exec(version.read())
 with open(join(CURDIR, 'README.rst')) as readme:
     README = readme.read()
 
@@ -55,6 +56,7 @@ setup(
     platforms='any',
     keywords='robotframework testing testautomation arista eos eapi pyeapi',
     packages=['AristaLibrary'],
+    python_requires='>=3.8',
     install_requires=[
         'docutils>=0.9',
         'pyeapi>=0.8.2,<2',
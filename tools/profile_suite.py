@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""Run a Robot Framework suite under cProfile and print the functions
+with the highest cumulative time.
+
+Usage: python tools/profile_suite.py [robot options] suite
+"""
+
+import sys
+import cProfile
+import pstats
+
+from robot import run_cli
+
+PROFILE_OUTPUT = 'profile.out'
+TOP_FRAMES = 50
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    cProfile.run('run_cli(sys.argv[1:], exit=False)', PROFILE_OUTPUT)
+    pstats.Stats(PROFILE_OUTPUT).sort_stats('cumulative').print_stats(
+        TOP_FRAMES)